@@ -1,165 +1,238 @@
+import os
 import math
-import copy
 import csv
+import argparse
+import contextlib
+import functools
+import concurrent.futures
+import numpy as np
+try:
+	import numba
+except ImportError:
+	numba = None
+
+# Index of each metric in the last axis of a cost array
+METRIC_IDX = {'width': 0, 'T_depth': 1, 'full_depth': 2, 'measure': 3, 'T_count': 4, 'single_qubit': 5, 'CNOT': 6}
+WIDTH = METRIC_IDX['width']
+# Index of each optimization profile in the second-to-last axis of a cost array
+LOW_DEPTH = 0
+LOW_T = 1
+LOW_WIDTH = 2
+# Multiplying a cost scales every metric except the width
+SCALED_METRICS = np.arange(len(METRIC_IDX)) != WIDTH
 
 # Represents the costs of something with circuits
 # optimizing for low width, low depth, etc.
+# Stored as an array of shape (..., 3, 7), with one row per profile
+# and one column per metric; any leading axes index many circuits
+# at once (e.g., one per window size)
 class Cost:
+	__slots__ = ('arr',)
+
 	def __init__(self, low_depth, low_T, low_width):
-		self.low_depth = low_depth
-		self.low_T = low_T
-		self.low_width = low_width
-
-	def add(self, cost2):
-		return Cost(
-			low_depth = self.low_depth.add(cost2.low_depth), 
-			low_T = self.low_T.add(cost2.low_T),
-			low_width = self.low_width.add(cost2.low_width)
-		)
+		self.arr = np.stack(np.broadcast_arrays(low_depth.arr, low_T.arr, low_width.arr), axis = -2)
 
-	def subtract(self, cost2):
-		return Cost(
-			low_depth = self.low_depth.subtract(cost2.low_depth), 
-			low_T = self.low_T.subtract(cost2.low_T),
-			low_width = self.low_width.subtract(cost2.low_width)
-		)
-	def multiply(self, n):
-		return Cost(
-			low_depth = self.low_depth.multiply(n), 
-			low_T = self.low_T.multiply(n),
-			low_width = self.low_width.multiply(n)
-		)
-	def message(self):
-		 message = ""
-		 message += "Width-optimal: \n" +self.low_width.message()
-		 message += "T-optimal: \n" + self.low_T.message()
-		 message += "Depth-optimal: \n" + self.low_depth.message() + "\n"
-		 return message
+	@classmethod
+	def from_array(Class, arr):
+		cost = Class.__new__(Class)
+		cost.arr = arr
+		return cost
 
+	@property
+	def low_depth(self):
+		return SingleCost.from_array(self.arr[..., LOW_DEPTH, :])
 
-# Contains all relevant cost metrics for a single circuit
-class SingleCost:
-	def __init__(self, width, T_depth, full_depth, measure, T_count, single_qubit, CNOT):
-		self.width = width
-		self.T_depth = T_depth
-		self.T_count = T_count
-		self.full_depth = full_depth
-		self.measure = measure
-		self.single_qubit = single_qubit
-		self.CNOT = CNOT
+	@property
+	def low_T(self):
+		return SingleCost.from_array(self.arr[..., LOW_T, :])
+
+	@property
+	def low_width(self):
+		return SingleCost.from_array(self.arr[..., LOW_WIDTH, :])
 
 	# Costs of two sequential circuits
 	# Uses the maximum width (assumes circuits are run sequentially)
-	def add(self, cost2):
-		return SingleCost(
-			width = max(self.width, cost2.width),
-			T_depth = self.T_depth + cost2.T_depth,
-			T_count = self.T_count + cost2.T_count,
-			full_depth = self.full_depth + cost2.full_depth,
-			measure = self.measure + cost2.measure,
-			single_qubit = self.single_qubit + cost2.single_qubit,
-			CNOT = self.CNOT + cost2.CNOT,
-		)
+	# If out is given, the result is written into that array
+	def add(self, cost2, out = None):
+		width = np.maximum(self.arr[..., WIDTH], cost2.arr[..., WIDTH])
+		arr = np.add(self.arr, cost2.arr, out = out)
+		arr[..., WIDTH] = width
+		return Cost.from_array(arr)
 
 	# Subtracts
 	# Assumes the width actually stays the same (does not decrease!)
 	def subtract(self, cost2):
-		return SingleCost(
-			width = self.width,
-			T_depth = self.T_depth - cost2.T_depth,
-			T_count = self.T_count - cost2.T_count,
-			full_depth = self.full_depth - cost2.full_depth,
-			measure = self.measure - cost2.measure,
-			single_qubit = self.single_qubit - cost2.single_qubit,
-			CNOT = self.CNOT - cost2.CNOT,
-		)
-	def multiply(self, n):
-		return SingleCost(
-			width = self.width,
-			T_depth = self.T_depth * n,
-			T_count = self.T_count * n,
-			full_depth = self.full_depth * n,
-			measure = self.measure * n,
-			single_qubit = self.single_qubit * n,
-			CNOT = self.CNOT * n
-		)
+		arr = self.arr - cost2.arr
+		arr[..., WIDTH] = self.arr[..., WIDTH]
+		return Cost.from_array(arr)
+
+	# n may be an array over the leading axes
+	# If out is given, the result is written into that array
+	def multiply(self, n, out = None):
+		scale = np.asarray(n)[..., np.newaxis, np.newaxis]
+		return Cost.from_array(np.multiply(self.arr, np.where(SCALED_METRICS, scale, 1), out = out))
+
+	# Picks out the costs at the given index when the costs
+	# are arrays (e.g., one entry per window size)
+	def select(self, index):
+		return Cost.from_array(self.arr[index])
+
+	# Makes the costs read-only, so that cached costs
+	# cannot be modified by callers
+	def freeze(self):
+		self.arr.setflags(write = False)
+		return self
+	def message(self):
+		return "".join([
+			"Width-optimal: \n", self.low_width.message(),
+			"T-optimal: \n", self.low_T.message(),
+			"Depth-optimal: \n", self.low_depth.message(), "\n"
+		])
+
+
+# Accesses one metric of a SingleCost
+def _metric(name):
+	index = METRIC_IDX[name]
+	def get(self):
+		# [()] returns a scalar, rather than a 0-d array, for a single circuit
+		return self.arr[..., index][()]
+	def set(self, value):
+		self.arr[..., index] = value
+	return property(get, set)
+
+# Contains all relevant cost metrics for a single circuit
+# Stored as an array whose last axis holds the metrics;
+# each metric may also be an array, to cost many circuits at once
+class SingleCost:
+	__slots__ = ('arr',)
+
+	def __init__(self, width, T_depth, full_depth, measure, T_count, single_qubit, CNOT):
+		metrics = np.broadcast_arrays(width, T_depth, full_depth, measure, T_count, single_qubit, CNOT)
+		self.arr = np.stack(metrics, axis = -1).astype(np.float64)
+
+	@classmethod
+	def from_array(Class, arr):
+		cost = Class.__new__(Class)
+		cost.arr = arr
+		return cost
+
+	width = _metric('width')
+	T_depth = _metric('T_depth')
+	full_depth = _metric('full_depth')
+	measure = _metric('measure')
+	T_count = _metric('T_count')
+	single_qubit = _metric('single_qubit')
+	CNOT = _metric('CNOT')
+
 	#Outputs the costs to a string
 	def message(self):
-		message = ""
-		message += "    CNOT: " + str(self.CNOT) + "\n"
-		message += "    Single-qubit: " + str(self.single_qubit) + "\n"
-		message += "    Measurements: " + str(self.measure) + "\n"
-		message += "    T gates: " + str(self.T_count) + "\n"
-		message += "    T-depth: " + str(self.T_depth) + "\n"
-		message += "    Full depth: " + str(self.full_depth) + "\n"
-		message += "    Width: " +str( self.width) + "\n"
-		return message
+		return "".join([
+			f"    CNOT: {self.CNOT}\n",
+			f"    Single-qubit: {self.single_qubit}\n",
+			f"    Measurements: {self.measure}\n",
+			f"    T gates: {self.T_count}\n",
+			f"    T-depth: {self.T_depth}\n",
+			f"    Full depth: {self.full_depth}\n",
+			f"    Width: {self.width}\n"
+		])
 
 	#A string which can act as a header for a similar csv as Q# outputs
 	@classmethod
 	def CSV_header(Class):
 		return "CNOT, Single Qubit, T gates, R gates, Measurements, T-depth, Initial Width, Extra Width, Full Depth, Window Size, Size\n"
 
-	# Outputs the costs in a row that matches the header
+	# Outputs the costs as a list of fields that match the header
+	def csv_fields(self):
+		return [self.CNOT, self.single_qubit, self.T_count, "", self.measure, self.T_depth, "", self.width, self.full_depth]
+
+	# Outputs the costs in a row that matches the header,
+	# formatted as the csv files written by this script
 	def csv_row(self):
-		message = ""
-		message += str(self.CNOT) + ", "
-		message += str(self.single_qubit) + ", "
-		message += str(self.T_count) + ", ,"
-		message += str(self.measure) + ", "
-		message += str(self.T_depth) + ", ,"
-		message += str(self.width) + ","
-		message += str(self.full_depth)
-		return message
+		return ",".join(str(field) for field in self.csv_fields())
+
+# Coefficients of the lookup costs, with one row per profile and 
+# metric (as in a cost array), and one column per term of
+# [2^window_size, n, window_size, 1, n*2^window_size]
+# Extrapolations based on output of Q#
+LOOKUP_COEFFS = np.array([
+	# low depth
+	[
+		[0.0, 2.0, 2.657, 21.623, 0.0],  # width
+		[0.50733, 0.0, 0.0, 23.0, 0.0],  # T_depth
+		[16.96, 0.0, 0.0, 97.63, 0.0],  # full_depth
+		[1.516, 2.0, 0.0, 2.185, 0.0],  # measure
+		[4.0, 0.0, 0.0, 24.0, 0.0],  # T_count
+		[7.793, 2.0, 0.0, 5.218, 0.0],  # single_qubit
+		[110.74, 0.0, 0.0, 134.52, 0.016]  # CNOT
+	],
+	# low T
+	[
+		[0.0, 2.01, 2.678, 19.81, 0.0],  # width
+		[0.50733, 0.0, 0.0, 23.0, 0.0],  # T_depth
+		[17.04, 0.0, 0.0, 101.04, 0.0],  # full_depth
+		[1.503, 2.0, 0.0, 4.071, 0.0],  # measure
+		[4.0, 0.0, 0.0, 24.0, 0.0],  # T_count
+		[7.74, 2.0, 0.0, 10.68, 0.0],  # single_qubit
+		[115.13, 0.0, 0.0, 117.76, 0.0]  # CNOT
+	],
+	# low width
+	[
+		[0.0, 2.0, 2.657, 21.623, 0.0],  # width
+		[0.50733, 0.0, 0.0, 23.0, 0.0],  # T_depth
+		[16.96, 0.0, 0.0, 97.98, 0.0],  # full_depth
+		[1.516, 2.0, 0.0, 2.288, 0.0],  # measure
+		[4.0, 0.0, 0.0, 24.0, 0.0],  # T_count
+		[7.793, 2.0, 0.0, 5.75, 0.0],  # single_qubit
+		[110.73, 0.0, 0.0, 136.793, 0.016]  # CNOT
+	]
+])
 
 # Returns the cost of a lookup for an n-bit elliptic curve point 
 # among a table of 2^window_size points
-# Extrapolations based on output of Q#
+# n and window_size may be NumPy arrays, which are broadcast together
 def Lookup_Cost(n, window_size):
-	main_exponent = 2**window_size;
-	costs = Cost(
-		low_T = SingleCost(
-			width = 2.678*window_size + 19.81+2.01*n,
-			T_depth = 0.50733*main_exponent+23.0,
-			full_depth = 17.04 * main_exponent + 101.04,
-			measure = 1.503*main_exponent + 4.071 + 2.0*n,
-			T_count = 4.0*main_exponent + 24.0,
-			single_qubit = 7.74 * main_exponent + 10.68 + 2.0*n,
-			CNOT = 115.13 * main_exponent + 117.76
-		),
-		low_width = SingleCost(
-			width = 2.657*window_size + 21.623 + 2.0*n,
-			T_depth = 0.50733*main_exponent + 23.0,
-			full_depth = 16.96 * main_exponent + 97.98,
-			measure = 1.516*main_exponent + 2.288 + 2.0*n,
-			T_count = 4.0*main_exponent + 24.0,
-			single_qubit = 7.793 * main_exponent + 5.75 + 2.0*n,
-			CNOT = main_exponent*(110.73+0.016*n) + 136.793
-		),
-		low_depth = SingleCost(
-			width = 2.657*window_size + 21.623 + 2.0*n,
-			T_depth = 0.50733*main_exponent + 23.0,
-			full_depth = 16.96 * main_exponent + 97.63,
-			measure = 1.516 * main_exponent + 2.185+2.0*n,
-			T_count = 4.0*main_exponent+24.0,
-			single_qubit = 7.793*main_exponent + 5.218 + 2.0*n,
-			CNOT = main_exponent*(110.74 + 0.016 * n) + 134.52
-		)
-	)	
-	return costs
+	main_exponent = 2.0**window_size
+	basis = np.stack(np.broadcast_arrays(main_exponent, n, window_size, 1.0, n*main_exponent), axis = -1)
+	return Cost.from_array(np.einsum('...k,pmk->...pm', basis, LOOKUP_COEFFS))
+
+# Number of window sizes in the lookup cost table for n-bit curves:
+# all window sizes up to n/2, and at least up to 8
+def num_lookup_windows(n):
+	return max(n // 2, 9)
+
+# Lookup cost tables, keyed by n
+lookup_costs_x6 = {}
+
+# Returns the cost of the 6 lookups in a point addition, for all
+# window sizes in the lookup cost table, indexed by window size
+# Cached, since it only depends on n
+def Lookup_Cost_x6(n):
+	if n not in lookup_costs_x6:
+		lookup_costs_x6[n] = Lookup_Cost(n, np.arange(num_lookup_windows(n))).multiply(6).freeze()
+	return lookup_costs_x6[n]
+
+# Fills the cache of Lookup_Cost_x6 for many sizes at once,
+# evaluating Lookup_Cost over a single grid of sizes by window sizes
+def precompute_lookup_costs(sizes):
+	sizes = np.asarray(sizes)
+	table = Lookup_Cost(sizes[:, np.newaxis], np.arange(num_lookup_windows(sizes.max())))
+	table = table.multiply(6).freeze()
+	for row, n in enumerate(sizes.tolist()):
+		lookup_costs_x6[n] = table.select(np.s_[row, :num_lookup_windows(n)])
 
 # Returns the costs of a single point addition with 
 # window size of 8
 # Based on estimates from Q#
 def point_addition_cost(n):
-	costs = {}
 	nsquared = n*n
-	lgn = math.log(n)/math.log(2.0)
+	lgn = math.log2(n)
+	# Exactly floor(lg(n)), without floating-point error
+	floor_lgn = n.bit_length() - 1
 	nlgn = n*lgn
 	n2lgn = nsquared*lgn
 	costs = Cost(
 		low_T = SingleCost(
-			width = 10.0*n + 1.5*math.floor(lgn) + 18.9,
+			width = 10.0*n + 1.5*floor_lgn + 18.9,
 			T_depth = 431.6*nsquared + 17572,
 			full_depth = 1562 * nsquared + 120830,
 			measure = 85*nsquared + 19465,
@@ -168,7 +241,7 @@ def point_addition_cost(n):
 			CNOT = 2391*nsquared + 473340
 		),
 		low_width = SingleCost(
-			width = 7.99*n + 3.81*math.floor(lgn) + 17.1,
+			width = 7.99*n + 3.81*floor_lgn + 17.1,
 			T_depth = 144.5 * n2lgn + 626302,
 			full_depth = 464.6 * n2lgn + 2074976,
 			measure = 753.7*n2lgn - 21095,
@@ -189,38 +262,36 @@ def point_addition_cost(n):
 
 	return costs
 
-def load_from_csv(csv_file_name, n, existing_costs = None):
-	csv.register_dialect('cost_csv_dialect', skipinitialspace = True)
-	with open(csv_file_name, newline="\n") as csvfile:
-		csvCosts = csv.DictReader(csvfile, dialect='cost_csv_dialect')
-		costs = SingleCost(0,0,0,0,0,0,0)
-		for row in csvCosts:
-			if (row['size'] == str(n)):
-				if existing_costs is None:
-					costs.CNOT = int(row['CNOT count'])
-					costs.single_qubit = int(row['1-qubit Clifford count'])
-					costs.T_count = int(row['T count'])
-					costs.measure = int(row['M count'])
-					costs.T_depth = int(row['T depth'])
-					costs.width = int(row['extra width'])
-					print(costs)
-				else:
-					costs = existing_costs
-					costs.full_depth = int(row['Full depth'])
-	return costs
+# Returns the rows of a csv file of Q# estimates, keyed by size
+# Cached, so that each file is only read once
+@functools.lru_cache(maxsize = None)
+def _parse_csv(csv_file_name):
+	with open(csv_file_name, newline = "") as csvfile:
+		csvCosts = csv.DictReader(csvfile, skipinitialspace = True)
+		return {int(row['size']): row for row in csvCosts}
+
+# Returns the costs for an n-bit curve from a csv file of Q# estimates, 
+# taking the full depth from the matching estimates that count all gates
+def load_from_csv(csv_file_name, all_gates_csv_file_name, n):
+	row = _parse_csv(csv_file_name)[n]
+	all_gates_row = _parse_csv(all_gates_csv_file_name)[n]
+	return SingleCost(
+		CNOT = int(row['CNOT count']),
+		single_qubit = int(row['1-qubit Clifford count']),
+		T_count = int(row['T count']),
+		measure = int(row['M count']),
+		T_depth = int(row['T depth']),
+		width = int(row['extra width']),
+		full_depth = int(all_gates_row['Full depth'])
+	)
 
 # Returns the costs of a single point addition with 
 # window size of 8 for fixed-modulus curves
 # Based on estimates from Q#
 def fixed_modulus_point_addition_cost(n):
-	low_T_costs = load_from_csv('EllipticCurveEstimates/LowT/Fixed-modulus-signed.csv', n)
-	low_T_costs = load_from_csv('EllipticCurveEstimates/LowT/Fixed-modulus-signed-all-gates.csv', n, low_T_costs)
-
-	low_width_costs = load_from_csv('EllipticCurveEstimates/LowWidth/Fixed-modulus-signed.csv', n)
-	low_width_costs = load_from_csv('EllipticCurveEstimates/LowWidth/Fixed-modulus-signed-all-gates.csv', n, low_width_costs)
-
-	low_depth_costs = load_from_csv('EllipticCurveEstimates/LowDepth/Fixed-modulus-signed.csv', n)
-	low_depth_costs = load_from_csv('EllipticCurveEstimates/LowDepth/Fixed-modulus-signed-all-gates.csv', n, low_depth_costs)
+	low_T_costs = load_from_csv('EllipticCurveEstimates/LowT/Fixed-modulus-signed.csv', 'EllipticCurveEstimates/LowT/Fixed-modulus-signed-all-gates.csv', n)
+	low_width_costs = load_from_csv('EllipticCurveEstimates/LowWidth/Fixed-modulus-signed.csv', 'EllipticCurveEstimates/LowWidth/Fixed-modulus-signed-all-gates.csv', n)
+	low_depth_costs = load_from_csv('EllipticCurveEstimates/LowDepth/Fixed-modulus-signed.csv', 'EllipticCurveEstimates/LowDepth/Fixed-modulus-signed-all-gates.csv', n)
 
 	return Cost(low_T = low_T_costs, low_width = low_width_costs, low_depth = low_depth_costs)
 
@@ -321,106 +392,159 @@ def fixed_modulus_point_addition_cost(n):
 	# return costs
 
 
+# Returns the total cost of Shor's algorithm using windows of 
+# size window_size, given the cost of a point addition without lookups
+# window_size may be a NumPy array of window sizes
+def compute_total_cost_for_window(blank_addition_cost, n, window_size):
+	# number of windows
+	num_windows = n // (window_size + 1)
+	# size of remainder window
+	remainder_window = np.maximum(n - num_windows * (window_size + 1), 0)
+	lookup_costs = Lookup_Cost_x6(n)
+	main_lookup_costs = lookup_costs.select(window_size)
+	# Preallocate the total and the remainder window costs, 
+	# so that all the arithmetic below is done in place
+	total_cost = Cost.from_array(np.empty(main_lookup_costs.arr.shape))
+	second_addition_cost = Cost.from_array(np.empty(main_lookup_costs.arr.shape))
+	# Add in the cost of doing that many lookups
+	blank_addition_cost.add(main_lookup_costs, out = total_cost.arr)
+	# The number of point additions that need to be done
+	total_cost.multiply(2*num_windows, out = total_cost.arr)
+
+	# If there is a "remainder window" (a window smaller than the 
+	# others to finish the remaining bits), add that cost
+	# (multiplied by 0 if there is no remainder window)
+	has_remainder = remainder_window > 0
+	second_lookup_costs = lookup_costs.select(remainder_window)
+	blank_addition_cost.add(second_lookup_costs, out = second_addition_cost.arr)
+	second_addition_cost.multiply(2*has_remainder, out = second_addition_cost.arr)
+	total_cost.add(second_addition_cost, out = total_cost.arr)
+	# Widths for all profiles at once: we add whichever lookup width is 
+	# greater (just the main one without a remainder window) to the 
+	# largest width of the additions
+	main_width = main_lookup_costs.arr[..., WIDTH]
+	lookup_width = np.where(has_remainder[..., np.newaxis], np.maximum(main_width, second_lookup_costs.arr[..., WIDTH]), main_width)
+	total_cost.arr[..., WIDTH] = np.maximum(blank_addition_cost.arr[..., WIDTH], lookup_width) + lookup_width
+	return total_cost
+
+# Without numba, the sweep over window sizes uses the NumPy 
+# version of compute_total_cost_for_window
+if numba is not None:
+	# Returns the array of total costs for all window sizes up to n/2,
+	# as in compute_total_cost_for_window, but as a compiled loop 
+	# over window sizes, profiles, and metrics
+	@numba.njit(cache = True)
+	def _sweep_window_sizes(n, blank, lookup_costs):
+		total = np.empty((n // 2, 3, 7))
+		for i in range(n // 2):
+			num_windows = n // (i + 1)
+			remainder_window = n - num_windows * (i + 1)
+			for profile in range(3):
+				for metric in range(7):
+					if metric == WIDTH:
+						lookup_width = lookup_costs[i, profile, WIDTH]
+						if remainder_window > 0:
+							lookup_width = max(lookup_width, lookup_costs[remainder_window, profile, WIDTH])
+						total[i, profile, WIDTH] = max(blank[profile, WIDTH], lookup_width) + lookup_width
+					else:
+						cost = (blank[profile, metric] + lookup_costs[i, profile, metric]) * (2 * num_windows)
+						if remainder_window > 0:
+							cost += (blank[profile, metric] + lookup_costs[remainder_window, profile, metric]) * 2
+						total[i, profile, metric] = cost
+		return total
+
 def get_optimal_shor(addition_cost, n):
 	#addition_cost = point_addition_cost(n)
-	eight_lookup_cost = Lookup_Cost(n, 8).multiply(6)
+	# With no window sizes to check, keep the window size of 8 that
+	# addition_cost was estimated with, for all 2n point additions
+	if n // 2 == 0:
+		fallback_cost = addition_cost.multiply(2*n)
+		return {"T": fallback_cost, "depth": fallback_cost, "width" : fallback_cost, "T-window" : 8, "depth-window" : 8, "width-window" : 8}
+	eight_lookup_cost = Lookup_Cost_x6(n).select(8)
 	# The cost of an addition without any lookups
 	# We also want to remove the qubits, too
 	blank_addition_cost = addition_cost.subtract(eight_lookup_cost)
-	blank_addition_cost.low_depth.width -= eight_lookup_cost.low_depth.width
-	blank_addition_cost.low_T.width -= eight_lookup_cost.low_T.width
-	blank_addition_cost.low_width.width -= eight_lookup_cost.low_width.width
-	best_T_size = 8
-	best_T = addition_cost.multiply(2*n)
-	best_depth = addition_cost.multiply(2*n)
-	best_depth_size = 8
-	best_width = addition_cost.multiply(2*n)
-	best_width_size = 8
-	# Check all window sizes up to n/2
-	for i in range(int(n/2)):
-		# number of windows
-		num_windows = math.floor( n / (i+1))
-		# size of remainder window
-		remainder_window = max(n - num_windows * (i+1), 0)
-		main_lookup_costs = Lookup_Cost(n,i).multiply(6)
-		# Add in the cost of doing that many lookups
-		main_addition_cost = blank_addition_cost.add(main_lookup_costs)
-		# The number of point additions that need to be done
-		total_cost = main_addition_cost.multiply(2*num_windows)
-		
-		# If there is a "remainder window" (a window smaller than the 
-		# others to finish the remaining bits), add that cost
-		if remainder_window > 0:
-			second_lookup_costs = Lookup_Cost(n,remainder_window).multiply(6)
-			second_addition_cost = blank_addition_cost.add(second_lookup_costs)
-			total_cost = total_cost.add(second_addition_cost.multiply(2))
-			#Here we add whichever width is greater
-			total_cost.low_depth.width += max(second_lookup_costs.low_depth.width, main_lookup_costs.low_depth.width)
-			total_cost.low_T.width += max(second_lookup_costs.low_T.width, main_lookup_costs.low_T.width)
-			total_cost.low_width.width += max(second_lookup_costs.low_width.width, main_lookup_costs.low_width.width)
-		else:
-			#With no remainder window, we add just the main lookup width
-			total_cost.low_depth.width += main_lookup_costs.low_depth.width
-			total_cost.low_T.width += main_lookup_costs.low_T.width
-			total_cost.low_width.width += main_lookup_costs.low_width.width
-		# Compare to previous best counts, update as needed
-		if total_cost.low_T.T_count < best_T.low_T.T_count:	
-			best_T = copy.deepcopy(total_cost)
-			best_T_size = i
-		if total_cost.low_width.T_count < best_width.low_width.T_count:
-			best_width = copy.deepcopy(total_cost)
-			best_width_size = i
-		if total_cost.low_depth.T_depth < best_depth.low_depth.T_depth:
-			best_depth = copy.deepcopy(total_cost)
-			best_depth_size = i
+	blank_addition_cost.arr[..., WIDTH] -= eight_lookup_cost.arr[..., WIDTH]
+	# Check all window sizes up to n/2 at once, as arrays indexed by window size
+	if numba is not None:
+		total_cost = Cost.from_array(_sweep_window_sizes(n, blank_addition_cost.arr, Lookup_Cost_x6(n).arr))
+	else:
+		total_cost = compute_total_cost_for_window(blank_addition_cost, n, np.arange(n // 2))
+
+	# Find the best window size for each cost, then 
+	# recompute the costs for just those window sizes
+	best_T_size = int(np.argmin(total_cost.low_T.T_count))
+	best_width_size = int(np.argmin(total_cost.low_width.T_count))
+	best_depth_size = int(np.argmin(total_cost.low_depth.T_depth))
+	best_T = compute_total_cost_for_window(blank_addition_cost, n, best_T_size)
+	best_width = compute_total_cost_for_window(blank_addition_cost, n, best_width_size)
+	best_depth = compute_total_cost_for_window(blank_addition_cost, n, best_depth_size)
 
 	return {"T": best_T, "depth": best_depth, "width" : best_width, "T-window" : best_T_size, "depth-window" : best_depth_size, "width-window" : best_width_size}
 
 
-# Checks all elliptic curve sizes up to 521, writes to csv files
-T_CSV = SingleCost.CSV_header()
-depth_CSV = SingleCost.CSV_header()
-width_CSV = SingleCost.CSV_header()
-for i in range(10,522):
-	costs = get_optimal_shor(point_addition_cost(i), i)
-	T_CSV += costs["T"].low_T.csv_row() + "," + str(costs["T-window"]) + "," + str(i) + "\n"
-	depth_CSV += costs["depth"].low_depth.csv_row() + "," + str(costs["depth-window"]) + "," + str(i) + "\n"
-	width_CSV += costs["width"].low_width.csv_row() + "," + str(costs["width-window"]) + "," + str(i) + "\n"
-
-
-
-
-t_file = open('shor_low_t.csv', 'a')
-t_file.write(T_CSV)
-t_file.close()
-
-depth_file = open('shor_low_depth.csv', 'a')
-depth_file.write(depth_CSV)
-depth_file.close()
-
-width_file = open('shor_low_width.csv', 'a')
-width_file.write(width_CSV)
-width_file.close()
-
-# Check fixed modulus sizes
-T_CSV = SingleCost.CSV_header()
-depth_CSV = SingleCost.CSV_header()
-width_CSV = SingleCost.CSV_header()
-for i in {256, 384, 521}:
-	costs = get_optimal_shor(fixed_modulus_point_addition_cost(i), i)
-	T_CSV += costs["T"].low_T.csv_row() + "," + str(costs["T-window"]) + "," + str(i) + "\n"
-	depth_CSV += costs["depth"].low_depth.csv_row() + "," + str(costs["depth-window"]) + "," + str(i) + "\n"
-	width_CSV += costs["width"].low_width.csv_row() + "," + str(costs["width-window"]) + "," + str(i) + "\n"
-
-
-t_file = open('shor_low_t_fixed.csv', 'a')
-t_file.write(T_CSV)
-t_file.close()
-
-depth_file = open('shor_low_depth_fixed.csv', 'a')
-depth_file.write(depth_CSV)
-depth_file.close()
-
-width_file = open('shor_low_width_fixed.csv', 'a')
-width_file.write(width_CSV)
-width_file.close()
+# Returns the csv rows of the optimal T, depth, and width costs 
+# for an n-bit curve, given a function for the point addition cost
+def optimal_shor_rows(addition_cost, n):
+	costs = get_optimal_shor(addition_cost(n), n)
+	return (
+		costs["T"].low_T.csv_fields() + [costs["T-window"], n],
+		costs["depth"].low_depth.csv_fields() + [costs["depth-window"], n],
+		costs["width"].low_width.csv_fields() + [costs["width-window"], n]
+	)
+
+# Sweeps with fewer sizes than this are not worth sending to worker processes
+MIN_PARALLEL_SIZES = 64
+
+# Finds the optimal window sizes for each of the given sizes, and writes 
+# the resulting costs to shor_low_{t,depth,width}<suffix>.csv in output_dir
+# Uses the executor's worker processes, if given, for large sweeps
+def write_optimal_shor(executor, sizes, addition_cost, output_dir, suffix):
+	compute_rows = functools.partial(optimal_shor_rows, addition_cost)
+	# Compute every row before opening the files, so that a failed run
+	# leaves any earlier results untouched
+	# map returns the rows in the same order as sizes
+	if executor is None or len(sizes) < MIN_PARALLEL_SIZES:
+		rows = list(map(compute_rows, sizes))
+	else:
+		rows = list(executor.map(compute_rows, sizes, chunksize = 16))
+	header = [field.strip() for field in SingleCost.CSV_header().split(",")]
+	with open(os.path.join(output_dir, 'shor_low_t' + suffix + '.csv'), 'w', newline = '') as t_file, \
+			open(os.path.join(output_dir, 'shor_low_depth' + suffix + '.csv'), 'w', newline = '') as depth_file, \
+			open(os.path.join(output_dir, 'shor_low_width' + suffix + '.csv'), 'w', newline = '') as width_file:
+		t_writer = csv.writer(t_file, lineterminator = '\n')
+		depth_writer = csv.writer(depth_file, lineterminator = '\n')
+		width_writer = csv.writer(width_file, lineterminator = '\n')
+		for writer in (t_writer, depth_writer, width_writer):
+			writer.writerow(header)
+		for t_row, depth_row, width_row in rows:
+			t_writer.writerow(t_row)
+			depth_writer.writerow(depth_row)
+			width_writer.writerow(width_row)
+
+def main():
+	parser = argparse.ArgumentParser(description = "Finds the optimal window sizes for Shor's algorithm and writes the resulting costs to csv files.")
+	parser.add_argument('--output-dir', default = '.', help = "directory for the output csv files (default: current directory)")
+	parser.add_argument('--jobs', type = int, default = 1, help = "number of worker processes (default: 1, which runs in this process)")
+	args = parser.parse_args()
+	os.makedirs(args.output_dir, exist_ok = True)
+
+	# Workers forked after this share the precomputed tables and the
+	# compiled numba kernel (warmed up by the small run below); 
+	# others rebuild them as needed
+	precompute_lookup_costs(range(10,522))
+	get_optimal_shor(point_addition_cost(10), 10)
+	# A single job runs in this process, without an executor
+	if args.jobs == 1:
+		pool = contextlib.nullcontext()
+	else:
+		pool = concurrent.futures.ProcessPoolExecutor(max_workers = args.jobs)
+	with pool as executor:
+		# Checks all elliptic curve sizes up to 521, writes to csv files
+		write_optimal_shor(executor, range(10,522), point_addition_cost, args.output_dir, '')
+
+		# Check fixed modulus sizes
+		write_optimal_shor(executor, {256, 384, 521}, fixed_modulus_point_addition_cost, args.output_dir, '_fixed')
+
+if __name__ == "__main__":
+	main()